@@ -1,47 +1,166 @@
 # data_processing.py
 
-import json
+import os
 import logging
-from typing import Dict, Any, Tuple, List
+import ijson
+import orjson
+from typing import Dict, Any, Tuple, List, Iterable, Set, Optional, Callable, BinaryIO
 
 logger = logging.getLogger(__name__)
 
+# Suffix of the append-only journal that sits next to the JSON data file.
+# Each line is a [key, record] pair; [key, null] marks a deletion.
+JOURNAL_SUFFIX = ".jsonl"
+# I/O buffer for the data files; pages accumulate in memory up to this size
+# before a journal write, and loads read the files in chunks of it
+IO_BUFFER_SIZE = 1 << 20
+# Sentinel for dictionary lookups where None is a valid value
+_MISSING = object()
 
-def load_existing_data(file_path: str) -> Dict[str, Any]:
+
+def _replay_journal(
+    journal_path: str,
+    data: Dict[str, Any],
+    record_factory: Optional[Callable[[Any], Any]] = None,
+) -> int:
+    """
+    Apply the entries of a JSON Lines journal to data in place.
+
+    Args:
+        journal_path (str): The path to the journal file.
+        data (Dict[str, Any]): The dictionary the journal is replayed onto.
+        record_factory (Optional[Callable[[Any], Any]]): Converts each decoded
+            entry before it is stored.
+
+    Returns:
+        int: The number of journal lines applied.
+    """
+    applied = 0
+    with open(journal_path, "rb", buffering=IO_BUFFER_SIZE) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                entry = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                # A torn final line from an interrupted run; everything before it is intact
+                logger.warning(f"Skipping corrupt journal line in {journal_path}")
+                continue
+            key, value = entry
+            if value is None:
+                data.pop(key, None)
+            else:
+                data[key] = value if record_factory is None else record_factory(value)
+            applied += 1
+    return applied
+
+
+def jsonl_to_dict(
+    journal_path: str, record_factory: Optional[Callable[[Any], Any]] = None
+) -> Dict[str, Any]:
     """
-    Load existing data from a JSON file.
+    Load a JSON Lines journal on its own into a dictionary, for tooling that
+    wants the journaled changes without the snapshot.
+
+    Args:
+        journal_path (str): The path to the journal file.
+        record_factory (Optional[Callable[[Any], Any]]): Converts each decoded
+            entry before it is stored.
+
+    Returns:
+        Dict[str, Any]: The entries left after replaying every line in order.
+    """
+    data = {}
+    _replay_journal(journal_path, data, record_factory)
+    return data
+
+
+def load_existing_data(
+    file_path: str, record_factory: Optional[Callable[[Any], Any]] = None
+) -> Dict[str, Any]:
+    """
+    Load existing data from a JSON file and replay its JSON Lines journal.
+
+    The snapshot is decoded one top-level entry at a time, so peak memory is
+    the loaded data plus a single entry rather than a second copy of the file.
 
     Args:
         file_path (str): The path to the JSON file containing existing data.
+        record_factory (Optional[Callable[[Any], Any]]): Converts each decoded
+            entry, e.g. VehicleRecord.from_dict. Entries are kept as decoded
+            JSON if omitted.
 
     Returns:
         Dict[str, Any]: A dictionary containing the loaded data.
     """
+    data = {}
     try:
-        with open(file_path, "r") as f:
-            data = json.load(f)
+        with open(file_path, "rb") as f:
+            # use_float keeps numbers as float rather than Decimal, as json would
+            items = ijson.kvitems(f, "", use_float=True, buf_size=IO_BUFFER_SIZE)
+            for key, value in items:
+                if record_factory is None:
+                    data[key] = value
+                    continue
+                try:
+                    data[key] = record_factory(value)
+                except (TypeError, AttributeError) as e:
+                    # One malformed entry must not cost the rest of the dataset
+                    logger.warning(f"Skipping malformed entry {key} in {file_path}: {e}")
             logger.info(f"Loaded existing data from {file_path}")
-            logger.debug(f"Loaded data contains {len(data)} entries")
-            return data
     except FileNotFoundError:
         logger.info(f"No existing data found at {file_path}. Starting fresh.")
-        return {}
-    except json.JSONDecodeError as e:
+    except ijson.JSONError as e:
         logger.error(f"Error decoding JSON from {file_path}: {e}. Starting fresh.")
         return {}
     except Exception as e:
         logger.error(f"Unexpected error loading data from {file_path}: {e}")
         return {}
 
+    journal_path = file_path + JOURNAL_SUFFIX
+    if os.path.exists(journal_path):
+        try:
+            applied = _replay_journal(journal_path, data, record_factory)
+            logger.info(f"Replayed {applied} journal entries from {journal_path}")
+        except Exception as e:
+            logger.error(f"Unexpected error replaying journal {journal_path}: {e}")
+
+    logger.debug(f"Loaded data contains {len(data)} entries")
+    return data
+
+
+def build_page_index(all_data: Dict[str, Any]) -> Dict[int, Set[str]]:
+    """
+    Group the keys of a dataset by the page number they were scraped from.
+
+    Args:
+        all_data (Dict[str, Any]): The complete dataset keyed as page_<n>_<id>.
+
+    Returns:
+        Dict[int, Set[str]]: A mapping of page number to the keys on that page.
+    """
+    page_index = {}
+    for key in all_data:
+        prefix, _, rest = key.partition("_")
+        number, _, _ = rest.partition("_")
+        if prefix == "page" and number.isdigit():
+            page_index.setdefault(int(number), set()).add(key)
+    return page_index
+
 
 def compare_and_update_data(
-    all_data: Dict[str, Any], new_page_data: Dict[str, Any], page_number: int
+    all_data: Dict[str, Any],
+    page_index: Dict[int, Set[str]],
+    new_page_data: Dict[str, Any],
+    page_number: int,
 ) -> Tuple[List[str], List[str], List[str]]:
     """
     Compare new data with existing data and update intelligently.
 
     Args:
         all_data (Dict[str, Any]): The complete dataset containing all entries.
+        page_index (Dict[int, Set[str]]): Keys of all_data grouped by page number,
+            kept in sync with all_data by this function.
         new_page_data (Dict[str, Any]): The new data extracted from the current page.
         page_number (int): The page number being processed.
 
@@ -55,52 +174,129 @@ def compare_and_update_data(
     added = []
     removed = []
 
-    # Identify existing entries for this page
-    existing_page_keys = [
-        key for key in all_data if key.startswith(f"page_{page_number}_")
-    ]
-
-    # Check for updated or new entries
-    for key, new_entry in new_page_data.items():
-        if key in all_data:
-            if all_data[key] != new_entry:
-                all_data[key] = new_entry
-                updated.append(key)
-        else:
+    # One pass over every key that is, or was, on this page; each key is
+    # looked up once per side and dispatched straight to its outcome
+    existing_page_keys = page_index.get(page_number, set())
+    for key in existing_page_keys | new_page_data.keys():
+        new_entry = new_page_data.get(key, _MISSING)
+        if new_entry is _MISSING:
+            all_data.pop(key, None)
+            removed.append(key)
+            continue
+
+        old_entry = all_data.get(key, _MISSING)
+        if old_entry is _MISSING:
             all_data[key] = new_entry
             added.append(key)
+        # Plain equality stops at the first differing field, which beats
+        # hashing a serialized copy of both entries on every page
+        elif old_entry != new_entry:
+            all_data[key] = new_entry
+            updated.append(key)
 
-    # Identify removed entries
-    for key in existing_page_keys:
-        if key not in new_page_data:
-            del all_data[key]
-            removed.append(key)
+    page_index[page_number] = set(new_page_data.keys())
 
     # Log detailed changes at the debug level
-    if updated:
-        logger.debug(f"Updated entries on page {page_number}: {updated}")
-    if added:
-        logger.debug(f"Added entries on page {page_number}: {added}")
-    if removed:
-        logger.debug(f"Removed entries on page {page_number}: {removed}")
+    if (updated or added or removed) and logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            f"Changes on page {page_number}: "
+            f"updated={updated}, added={added}, removed={removed}"
+        )
 
     return updated, added, removed
 
 
-def save_data(file_path: str, data: Dict[str, Any]) -> None:
+def open_journal(file_path: str) -> BinaryIO:
     """
-    Save data to a JSON file.
+    Open the JSON Lines journal of a data file for appending.
+
+    The handle is meant to stay open for a whole run, so journaling a page is
+    a buffered write rather than an open/close per page.
+
+    Args:
+        file_path (str): The path to the JSON data file the journal belongs to.
+
+    Returns:
+        BinaryIO: The journal, opened in binary append mode.
+    """
+    return open(file_path + JOURNAL_SUFFIX, "ab", buffering=IO_BUFFER_SIZE)
+
+
+def append_page_jsonl(
+    journal: BinaryIO,
+    page_data: Dict[str, Any],
+    changed: Iterable[str],
+    removed: Iterable[str],
+) -> None:
+    """
+    Append the changes of one page to an open JSON Lines journal.
+
+    Only the delta is written, so the cost of a page no longer grows with the
+    size of the full dataset. Use save_data to compact the journal.
+
+    Args:
+        journal (BinaryIO): The journal, as returned by open_journal.
+        page_data (Dict[str, Any]): The data extracted from the current page.
+        changed (Iterable[str]): Keys of updated or added entries in page_data.
+        removed (Iterable[str]): Keys of entries that were removed.
+    """
+    try:
+        # (key, record) tuples serialize straight to JSON arrays, with no
+        # single-entry dict built per line
+        lines = [orjson.dumps((key, page_data[key])) for key in changed]
+        lines.extend(orjson.dumps((key, None)) for key in removed)
+        if lines:
+            journal.write(b"\n".join(lines) + b"\n")
+    except (IOError, TypeError, orjson.JSONEncodeError) as e:
+        logger.error(f"Failed to append journal {journal.name}: {e}")
+
+
+def save_data(
+    file_path: str,
+    data: Dict[str, Any],
+    journal: Optional[BinaryIO] = None,
+    pretty: bool = False,
+) -> None:
+    """
+    Save data to a JSON file, compacting away its JSON Lines journal.
+
+    The snapshot is written to a temporary file and renamed over the target,
+    so a crash or a concurrent reader never sees a half-written file.
 
     Args:
         file_path (str): The path to the JSON file where data will be saved.
-        data (Dict[str, Any]): The data to be saved.
+        data (Dict[str, Any]): The data to be saved. Dataclass entries are
+            written as JSON objects.
+        journal (Optional[BinaryIO]): The open journal of file_path, if any.
+            It is truncated in place instead of the journal file being removed.
+        pretty (bool): Indent the JSON for human readers. Compact output is
+            roughly half the size and faster to write.
+
+    Raises:
+        Exception: If the data could not be serialized or written.
     """
+    tmp_path = file_path + ".tmp"
     try:
-        with open(file_path, "w") as f:
-            json.dump(data, f, indent=2)
+        # Serialize to memory and hand the file one write, never many small ones
+        payload = orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else 0)
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, file_path)
+        # The snapshot now holds every journaled change
+        if journal is not None:
+            journal.truncate(0)
+        else:
+            journal_path = file_path + JOURNAL_SUFFIX
+            if os.path.exists(journal_path):
+                os.remove(journal_path)
         logger.info(f"Data saved to {file_path}")
         logger.debug(f"Saved data contains {len(data)} entries")
-    except (IOError, TypeError, json.JSONEncodeError) as e:
+    except (IOError, TypeError, orjson.JSONEncodeError) as e:
         logger.error(f"Failed to save data to {file_path}: {e}")
+        raise
     except Exception as e:
         logger.error(f"Unexpected error saving data to {file_path}: {e}")
+        raise
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -1,16 +1,45 @@
 import logging
 import re
-from typing import Dict, Any, Optional
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from operator import attrgetter
+from typing import Dict, Any, Iterable, List, Optional
+from models import VehicleRecord
 from .supabase_client import get_supabase_client
 
 logger = logging.getLogger(__name__)
 
+_RE_DIGITS = re.compile(r"\d+")
+_PRICE_DEL = str.maketrans("", "", "$, \t\n")
+
+# Rows per upsert request, well below PostgREST's request and parameter limits
+UPSERT_CHUNK_SIZE = 500
+# Upsert requests in flight at once for batches larger than one chunk
+UPSERT_WORKERS = 4
+
+# Columns of the vehicles table copied as-is from scraped data
+_FIELDS = (
+    "name",
+    "year",
+    "make",
+    "model",
+    "category",
+    "price_reference",
+    "mpg_combined",
+    "rating_expert",
+    "rating_consumer",
+    "description",
+)
+_get_fields = attrgetter(*_FIELDS)
+
 
 def parse_price(price_str: str) -> Optional[float]:
     """Converts '$32,315' to 32315.0"""
     if not price_str or not isinstance(price_str, str) or price_str == "N/A":
         return None
-    clean_str = price_str.replace("$", "").replace(",", "").strip()
+    clean_str = price_str.translate(_PRICE_DEL)
     try:
         return float(clean_str)
     except ValueError:
@@ -22,9 +51,7 @@ def parse_mpg(mpg_str: str) -> Optional[int]:
     if not mpg_str or not isinstance(mpg_str, str) or mpg_str == "N/A":
         return None
     # Extract first number found
-    import re
-
-    match = re.search(r"\d+", mpg_str)
+    match = _RE_DIGITS.search(mpg_str)
     if match:
         return int(match.group())
     return None
@@ -40,56 +67,129 @@ def parse_rating(rating_str: str) -> Optional[float]:
         return None
 
 
-def upsert_vehicle_batch(vehicles_data: Dict[str, Any]) -> int:
-    """Upserts a batch of vehicles into the database."""
-    supabase = get_supabase_client()
+def build_vehicle_record(vehicle: VehicleRecord) -> Optional[Dict[str, Any]]:
+    """Maps a scraped vehicle to a row of the vehicles table, or None if it has no ID."""
+    # Critical Check: Ensure kbb_id is present
+    # Supabase will reject rows with null kbb_id because it is the unique constraint/primary key
+    kbb_id = vehicle.kbb_id
+    if not kbb_id:
+        logger.warning(f"Skipping vehicle '{vehicle.name}' - Missing kbb_id.")
+        return None
 
-    records_to_upsert = []
+    # attrgetter/zip copy the columns in C instead of one bytecode-level getattr per field
+    record = dict(zip(_FIELDS, _get_fields(vehicle)))
+    record["kbb_id"] = kbb_id
+    record["updated_at"] = "now()"
+    return record
 
-    for unique_id, data in vehicles_data.items():
-        # Critical Check: Ensure kbb_id is present
-        # Supabase will reject rows with null kbb_id because it is the unique constraint/primary key
-        # If scraper extraction failed to get URL, we try fallback to ID, otherwise skip
-        kbb_id = data.get("kbb_id")
-        if not kbb_id:
-            # Try fallback to scraper's 'id' field if available (e.g. vehicle_card_123)
-            fallback_id = data.get("id")
-            if fallback_id:
-                kbb_id = f"card_{fallback_id}"
-            else:
-                logger.warning(
-                    f"Skipping vehicle '{data.get('name')}' - Missing kbb_id and no fallback ID."
-                )
-                continue
-
-        record = {
-            "kbb_id": kbb_id,  # Use the validated ID
-            "name": data.get("name"),
-            "year": data.get("year"),
-            "make": data.get("make"),
-            "model": data.get("model"),
-            "category": data.get("category"),
-            "price_reference": data.get("price_reference"),
-            "mpg_combined": data.get("mpg_combined"),
-            "rating_expert": data.get("rating_expert"),
-            "rating_consumer": data.get("rating_consumer"),
-            "description": data.get("description"),
-            "updated_at": "now()",
-        }
-        records_to_upsert.append(record)
-
-    if not records_to_upsert:
+
+def _upsert_chunk(supabase, chunk: List[Dict[str, Any]]) -> int:
+    """Sends one upsert request; returns the row count, or 0 if it failed."""
+    try:
+        supabase.table("vehicles").upsert(chunk, on_conflict="kbb_id").execute()
+        return len(chunk)
+    except Exception as e:
+        logger.error(f"Error upserting {len(chunk)} vehicles to supabase: {e}")
+        return 0
+
+
+def upsert_records(records: List[Dict[str, Any]]) -> int:
+    """
+    Upserts already-built vehicle rows and returns how many were written.
+    Rows are split into UPSERT_CHUNK_SIZE chunks sent concurrently.
+    """
+    if not records:
         return 0
 
+    # One statement may not touch the same kbb_id twice; the last row wins.
+    # Sorting gives each chunk a disjoint, contiguous kbb_id range, so
+    # concurrent chunks contend less on the same index pages.
+    by_id = {record["kbb_id"]: record for record in records}
+    records = [by_id[kbb_id] for kbb_id in sorted(by_id)]
+    chunks = [
+        records[i : i + UPSERT_CHUNK_SIZE]
+        for i in range(0, len(records), UPSERT_CHUNK_SIZE)
+    ]
+
     try:
-        response = (
-            supabase.table("vehicles")
-            .upsert(records_to_upsert, on_conflict="kbb_id")
-            .execute()
-        )
-        count = len(records_to_upsert)
-        logger.info(f"Successfully upserted {count} vehicles to supabase")
-        return count
+        supabase = get_supabase_client()
     except Exception as e:
         logger.error(f"Error upserting vehicles to supabase: {e}")
         return 0
+
+    if len(chunks) == 1:
+        count = _upsert_chunk(supabase, chunks[0])
+    else:
+        workers = min(UPSERT_WORKERS, len(chunks))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            count = sum(executor.map(lambda c: _upsert_chunk(supabase, c), chunks))
+
+    if count:
+        logger.info(f"Successfully upserted {count} vehicles to supabase")
+    return count
+
+
+def upsert_vehicle_batch(vehicles_data: Dict[str, VehicleRecord]) -> int:
+    """Upserts a batch of vehicles into the database."""
+    records_to_upsert = []
+    for data in vehicles_data.values():
+        record = build_vehicle_record(data)
+        if record:
+            records_to_upsert.append(record)
+
+    return upsert_records(records_to_upsert)
+
+
+class UpsertWorker(threading.Thread):
+    """
+    Background thread that drains queued vehicles into batched upserts.
+    Records from many pages are coalesced into one request once batch_size
+    rows are waiting or flush_interval seconds have passed since the first.
+    """
+
+    def __init__(self, batch_size: int = 500, flush_interval: float = 2.0):
+        super().__init__(name="UpsertWorker", daemon=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.upserted = 0
+        self._queue: "queue.Queue[Optional[List[VehicleRecord]]]" = queue.Queue()
+
+    def enqueue(self, vehicles: Iterable[VehicleRecord]) -> None:
+        """Queues scraped vehicles for upsert without waiting on the database."""
+        self._queue.put(list(vehicles))
+
+    def flush_and_close(self, timeout: Optional[float] = None) -> None:
+        """Upserts everything still queued and stops the thread."""
+        self._queue.put(None)
+        self.join(timeout)
+
+    def run(self) -> None:
+        buffer = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                vehicles = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                vehicles = []
+
+            if vehicles is None:
+                self._flush(buffer)
+                return
+
+            for data in vehicles:
+                record = build_vehicle_record(data)
+                if record:
+                    buffer.append(record)
+            if buffer and deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+
+            if buffer and (
+                len(buffer) >= self.batch_size or time.monotonic() >= deadline
+            ):
+                self._flush(buffer)
+                buffer = []
+                deadline = None
+
+    def _flush(self, buffer: List[Dict[str, Any]]) -> None:
+        self.upserted += upsert_records(buffer)
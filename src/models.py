@@ -0,0 +1,45 @@
+# models.py
+
+import sys
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Optional
+
+# Low-cardinality text fields; every record shares one copy of each value
+_INTERNED_FIELDS = ("make", "category")
+
+
+@dataclass(slots=True, frozen=True)
+class VehicleRecord:
+    """
+    One scraped vehicle. Slots keep each of the (possibly tens of thousands)
+    in-memory records far smaller than the equivalent dict, and make and
+    category are interned, whether scraped or loaded from disk.
+    """
+
+    kbb_id: Optional[str] = None
+    name: Optional[str] = None
+    year: Optional[int] = None
+    make: Optional[str] = None
+    model: Optional[str] = None
+    category: Optional[str] = None
+    price_reference: Optional[int] = None
+    mpg_combined: Optional[int] = None
+    rating_expert: Optional[float] = None
+    rating_consumer: Optional[float] = None
+    description: Optional[str] = None
+
+    def __post_init__(self) -> None:
+        # Frozen, so bypass the dataclass __setattr__ guard
+        for field in _INTERNED_FIELDS:
+            value = getattr(self, field)
+            if type(value) is str:
+                object.__setattr__(self, field, sys.intern(value))
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "VehicleRecord":
+        """Builds a record from a decoded JSON object, ignoring unknown keys."""
+        return cls(*map(data.get, VEHICLE_FIELDS))
+
+
+# Field names in declaration order
+VEHICLE_FIELDS = tuple(f.name for f in fields(VehicleRecord))
@@ -8,62 +8,77 @@ sys.path.append(current_dir)
 import re
 import time
 import random
+import asyncio
 import logging
+import functools
 import pip_system_certs.wrapt_requests
-from typing import Dict, Any, Optional
-from bs4 import BeautifulSoup, Tag
-from pydantic import BaseModel, Field, ValidationError, field_validator
+from aiolimiter import AsyncLimiter
+import xxhash
+from cachetools import LRUCache
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable
+import lxml.html
+from lxml import etree
+from lxml.html import HtmlElement
 
 from utils import (
     create_session,
     get_proxy,
     get_user_agent,
-    get_cached_or_request,
+    get_cached,
+    request_page,
+    store_cached,
+    evict_cached,
+    RateLimitedError,
     test_proxy,
     setup_logging,
     config,
 )
 
-from data_processing import load_existing_data, compare_and_update_data, save_data
-from db.operations import upsert_vehicle_batch
+from data_processing import (
+    load_existing_data,
+    build_page_index,
+    compare_and_update_data,
+    open_journal,
+    append_page_jsonl,
+    save_data,
+)
+from db.operations import UpsertWorker
+from models import VehicleRecord
 
 logger = logging.getLogger(__name__)
 
+# Patterns used on every card, compiled once at import
+_RE_DIGITS = re.compile(r"\d+")
+_RE_NONDIGIT = re.compile(r"[^\d]")
+# Browser headers that never change; only the User-Agent rotates per page
+_STATIC_HEADERS = {
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+    "Referer": config.get("BaseURL"),
+    "DNT": "1",
+    "Connection": "keep-alive",
+    "Upgrade-Insecure-Requests": "1",
+}
+# Appears in the raw HTML of every page that has vehicle cards
+_CARD_MARKER = b"vehicle_card_"
+# Characters stripped from well-formed prices like "$25,000"
+_PRICE_DEL = str.maketrans("", "", "$, \t\n")
+# Extracted records keyed by a hash of the card's HTML; listings rarely change
+# between runs and pages, so identical cards skip the XPath work entirely
+_CARD_CACHE: "LRUCache[int, VehicleRecord]" = LRUCache(maxsize=20_000)
+
 # ==========================================
-# 1. Pydantic Data Model (The Blueprint)
+# 1. Vehicle Schema Bounds
 # ==========================================
 
-
-class Vehicle(BaseModel):
-    """
-    Defines the strict schema for a vehicle.
-    Pydantic will automatically validate types (int, float, str)
-    and ensure optional fields are handled correctly.
-    """
-
-    kbb_id: Optional[str] = Field(default=None, description="The unique KBB URL path")
-    name: Optional[str] = None
-    year: Optional[int] = None
-    make: Optional[str] = None
-    model: Optional[str] = None
-    category: Optional[str] = None
-
-    # Metrics
-    price_reference: Optional[int] = Field(default=None, ge=0)  # Must be >= 0
-    mpg_combined: Optional[int] = Field(default=None, ge=0)
-    rating_expert: Optional[float] = Field(default=None, ge=0, le=5)  # 0.0 to 5.0
-    rating_consumer: Optional[float] = Field(default=None, ge=0, le=5)
-
-    description: Optional[str] = None
-
-    # Custom Validator: Ensure kbb_id starts with a slash if present
-    @field_validator("kbb_id")
-    @classmethod
-    def validate_kbb_id(cls, v: Optional[str]) -> Optional[str]:
-        if v and not v.startswith("/"):
-            # We can fix it automatically or raise an error. Let's fix it.
-            return f"/{v}"
-        return v
+# Inclusive (min, max) range per numeric field; None means unbounded.
+# Anything outside its range is dropped to None before the record is stored.
+_FIELD_BOUNDS = {
+    "price_reference": (0, None),
+    "mpg_combined": (0, None),
+    "rating_expert": (0, 5),  # 0.0 to 5.0
+    "rating_consumer": (0, 5),
+}
 
 
 # ==========================================
@@ -75,7 +90,11 @@ def clean_price(price: Any) -> Optional[int]:
     """Extracts integer price from string (e.g., '$25,000' -> 25000)."""
     if not price or str(price).lower() in ["none", "null", "n/a"]:
         return None
-    clean_str = re.sub(r"[^\d]", "", str(price))
+    raw = str(price)
+    clean_str = raw.translate(_PRICE_DEL)
+    if not clean_str.isdecimal():
+        # Unusual formatting (e.g. "$25,000 MSRP"); strip every non-digit
+        clean_str = _RE_NONDIGIT.sub("", raw)
     try:
         return int(clean_str)
     except ValueError:
@@ -96,90 +115,160 @@ def clean_mpg(mpg: Any) -> Optional[int]:
     """Extracts integer MPG from string (e.g., '30 MPG' -> 30)."""
     if not mpg or str(mpg).lower() in ["none", "null", "n/a"]:
         return None
-    match = re.search(r"(\d+)", str(mpg))
+    match = _RE_DIGITS.search(str(mpg))
     if match:
         try:
-            return int(match.group(1))
+            return int(match.group())
         except ValueError:
             return None
     return None
 
 
 # ==========================================
-# 3. HTML Extraction Helpers
+# 3. HTML Extraction Helpers (lxml)
 # ==========================================
 
+# Pages arrive as raw bytes; KBB serves UTF-8, so decode as that rather than
+# libxml2's Latin-1 default when a page has no charset declaration. Comments
+# and processing instructions are never read, so no nodes are built for them,
+# and the id hash table libxml2 keeps for getElementById is skipped.
+_HTML_PARSER = lxml.html.HTMLParser(
+    encoding="utf-8", remove_comments=True, remove_pis=True, collect_ids=False
+)
+
+# Namespace for EXSLT regular expressions in XPath (re:test)
+_NS = {"re": "http://exslt.org/regular-expressions"}
+
+# Compiled once at import; every card reuses them instead of re-parsing the
+# expression on each .xpath() call. $label is bound per call.
+_XP_CARDS = etree.XPath('//div[starts-with(@id, "vehicle_card_")]')
+_XP_DETAILS_LINK = etree.XPath('.//a[contains(@class, "e1uau9z02")]')
+_XP_NAME_LINK = etree.XPath('.//a[contains(@class, "ewtqiv30")]')
+_XP_HEADING = etree.XPath('.//h2[contains(@class, "argo-heading")]')
+_XP_HEADING_LINK = etree.XPath(
+    './/a[re:test(@class, "css-[a-z0-9]+ ewtqiv30")]', namespaces=_NS
+)
+# Body-style badge ("SUV", "Sedan"); e19qstch21 is the heading block
+_XP_CATEGORY = etree.XPath('.//div[contains(@class, "e19qstch20")]')
+_XP_LABEL = etree.XPath(".//div[not(*) and . = $label]")
+_XP_LABEL_VALUE = etree.XPath(
+    '(.//div[not(*) and . = $label])[1]'
+    '/ancestor::div[@direction="horizontal"][1]'
+    '//div[contains(@class, "e151py7u1")]'
+)
+_XP_LABEL_ROW_DIVS = etree.XPath(
+    '(.//div[not(*) and . = $label])[1]'
+    '/ancestor::div[@direction="horizontal"][1]//div'
+)
+_XP_HORIZONTAL_ANCESTOR = etree.XPath('ancestor::div[@direction="horizontal"][1]')
+_XP_VALUE = etree.XPath('.//div[contains(@class, "e151py7u1")]')
+_XP_CHILD_DIVS = etree.XPath("./div")
+_XP_RATING = etree.XPath(
+    '(.//div[not(*) and . = $label])[1]'
+    '/../descendant::div[re:test(@class, "css-[a-z0-9]+")][1]',
+    namespaces=_NS,
+)
+# Blurb under the card; e19qstch18 holds the ratings and MPG block
+_XP_DESCRIPTION = etree.XPath('.//div[contains(@class, "e19qstch17")]')
+_XP_SPAN = etree.XPath(".//span")
+_XP_CAPTCHA = etree.XPath(
+    '//div[contains(concat(" ", normalize-space(@class), " "), " g-recaptcha ")]'
+)
+
+
+def _first(nodes: List[Any]) -> Any:
+    """Returns the first XPath result, or None if there is none."""
+    return nodes[0] if nodes else None
+
 
-def get_vehicle_header_info(card: Tag) -> Dict[str, Any]:
+def _text(node: Optional[HtmlElement]) -> Optional[str]:
+    """Returns the stripped text of a node, or None if there is no node."""
+    return node.text_content().strip() if node is not None else None
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_name(raw_name: str) -> Tuple[Optional[int], Optional[str], Optional[str]]:
+    """
+    Splits a vehicle name such as '2026 Land Rover Evoque' into year, make, model.
+    Names repeat heavily across pages, so results are memoized.
+    """
+    year, make, model = None, None, None
+    parts = raw_name.split()
+    if len(parts) > 1:
+        if parts[0].isdigit() and len(parts[0]) == 4:
+            year = parts.pop(0)
+        elif parts[-1].isdigit() and len(parts[-1]) == 4:
+            year = parts.pop(-1)
+
+        if parts:
+            make = parts[0]
+            model = " ".join(parts[1:])
+
+    return int(year) if year else None, make, model
+
+
+def get_vehicle_header_info(card: HtmlElement) -> Dict[str, Any]:
     """Extracts core identity info: Name, Year, Make, Model, Category, KBB_ID."""
     info = {}
 
     # 1. KBB Link (Primary ID)
-    details_link = card.find("a", class_=re.compile(r"e1uau9z02"))
-    if not details_link:
-        details_link = card.find("a", class_=re.compile(r"ewtqiv30"))
+    details_link = _first(_XP_DETAILS_LINK(card))
+    if details_link is None:
+        details_link = _first(_XP_NAME_LINK(card))
 
-    if details_link and details_link.has_attr("href"):
-        info["kbb_id"] = details_link["href"].strip()
+    href = details_link.get("href") if details_link is not None else None
+    if href is not None:
+        info["kbb_id"] = href.strip()
     else:
         raw_id = card.get("id", "unknown")
         logger.warning(f"No details link found for card {raw_id}")
         info["kbb_id"] = None
 
     # 2. Vehicle Name
-    name_tag = card.find("h2", class_=re.compile(r"argo-heading"))
-    if not name_tag:
-        name_tag = card.find("a", class_=re.compile(r"css-[a-z0-9]+ ewtqiv30"))
+    name_tag = _first(_XP_HEADING(card))
+    if name_tag is None:
+        name_tag = _first(_XP_HEADING_LINK(card))
 
-    raw_name = name_tag.text.strip() if name_tag else None
+    raw_name = _text(name_tag)
     info["name"] = raw_name
 
     # 3. Parse Year, Make, Model
-    year, make, model = None, None, None
-    if raw_name:
-        parts = raw_name.split()
-        if len(parts) > 1:
-            if parts[0].isdigit() and len(parts[0]) == 4:
-                year = parts.pop(0)
-            elif parts[-1].isdigit() and len(parts[-1]) == 4:
-                year = parts.pop(-1)
-
-            if parts:
-                make = parts[0]
-                model = " ".join(parts[1:])
-
-    info["year"] = int(year) if year else None
-    info["make"] = make
-    info["model"] = model
+    info["year"], info["make"], info["model"] = (
+        _parse_name(raw_name) if raw_name else (None, None, None)
+    )
 
     # 4. Category
-    cat_div = card.find("div", class_=re.compile(r"e19qstch21"))
-    info["category"] = cat_div.text.strip() if cat_div else None
+    info["category"] = _text(_first(_XP_CATEGORY(card)))
 
     return info
 
 
-def find_metric_value(card: Tag, label_text: str) -> Optional[str]:
+def find_metric_value(card: HtmlElement, label_text: str) -> Optional[str]:
     """Finds a value associated with a specific label by traversing up the DOM."""
-    label = card.find("div", string=label_text)
-    if not label:
+    # Common layout: label and value share a horizontal flex container
+    value_div = _first(_XP_LABEL_VALUE(card, label=label_text))
+    if value_div is not None:
+        return _text(value_div)
+
+    label = _first(_XP_LABEL(card, label=label_text))
+    if label is None:
         return None
 
-    flex_container = label.find_parent("div", direction="horizontal")
-    if not flex_container:
+    flex_container = _first(_XP_HORIZONTAL_ANCESTOR(label))
+    if flex_container is None:
         curr = label
         for _ in range(3):
-            if curr.parent:
-                curr = curr.parent
-                if "direction" in curr.attrs or len(list(curr.children)) > 1:
+            if curr.getparent() is not None:
+                curr = curr.getparent()
+                if "direction" in curr.attrib or len(curr) > 1:
                     flex_container = curr
                     break
 
-    if flex_container:
-        value_div = flex_container.find("div", class_=re.compile(r"e151py7u1"))
-        if not value_div:
-            for child in flex_container.find_all("div", recursive=False):
-                text = child.get_text()
+    if flex_container is not None:
+        value_div = _first(_XP_VALUE(flex_container))
+        if value_div is None:
+            for child in _XP_CHILD_DIVS(flex_container):
+                text = child.text_content()
                 if (
                     any(x in text for x in ["$", "MPG"])
                     and text != label_text
@@ -187,49 +276,79 @@ def find_metric_value(card: Tag, label_text: str) -> Optional[str]:
                 ):
                     value_div = child
                     break
-        return value_div.text.strip() if value_div else None
+        return _text(value_div)
     return None
 
 
-def get_ratings(card: Tag) -> Dict[str, Optional[float]]:
+def get_ratings(card: HtmlElement) -> Dict[str, Optional[float]]:
     """Extracts ratings."""
     ratings = {"rating_expert": None, "rating_consumer": None}
     for r_type in ["Expert", "Consumer"]:
-        label = card.find("div", string=r_type)
-        if label and label.parent:
-            score_div = label.parent.find("div", class_=re.compile(r"css-[a-z0-9]+"))
-            if score_div:
-                clean_txt = score_div.text.strip()
-                if clean_txt.replace(".", "").isdigit():
-                    key = f"rating_{r_type.lower()}"
-                    ratings[key] = clean_rating(clean_txt)
+        clean_txt = _text(_first(_XP_RATING(card, label=r_type)))
+        if clean_txt is not None and clean_txt.replace(".", "").isdigit():
+            ratings[f"rating_{r_type.lower()}"] = clean_rating(clean_txt)
     return ratings
 
 
 # ==========================================
-# 3. Main Extraction Orchestrator (With Pydantic)
+# 3b. Main Extraction Orchestrator (With Validation)
 # ==========================================
 
 
-def extract_vehicle_data(card: BeautifulSoup) -> Optional[Dict[str, Any]]:
+def _finalize_vehicle_data(data: Dict[str, Any]) -> VehicleRecord:
+    """
+    Checks every numeric field against _FIELD_BOUNDS, normalizes kbb_id and
+    freezes the result into a VehicleRecord.
+    """
+    violations = []
+    for field, (low, high) in _FIELD_BOUNDS.items():
+        value = data[field]
+        if value is not None and (value < low or (high is not None and value > high)):
+            violations.append(f"{field}={value}")
+            data[field] = None
+
+    # Ensure kbb_id starts with a slash if present
+    kbb_id = data["kbb_id"]
+    if kbb_id and not kbb_id.startswith("/"):
+        data["kbb_id"] = f"/{kbb_id}"
+
+    if violations:
+        error_id = data["kbb_id"] or data["name"] or "Unknown"
+        logger.error(
+            f"❌ DATA VALIDATION FAILED for {error_id}: dropped {', '.join(violations)}"
+        )
+
+    return VehicleRecord(**data)
+
+
+def extract_vehicle_data(card: HtmlElement) -> VehicleRecord:
     """
-    Extracts data, validates it using the Vehicle Pydantic model,
-    and returns a clean dictionary. Returns None if validation fails.
+    Extracts data from an lxml card element with XPath, checks every numeric
+    field against _FIELD_BOUNDS, and returns a clean VehicleRecord.
+    Out-of-range values are set to None. Records are frozen, so a card whose
+    HTML was seen before returns the cached record.
     """
+    card_hash = xxhash.xxh64(lxml.html.tostring(card, with_tail=False)).intdigest()
+    vehicle = _CARD_CACHE.get(card_hash)
+    if vehicle is None:
+        vehicle = _extract_vehicle_data(card)
+        _CARD_CACHE[card_hash] = vehicle
+    return vehicle
+
+
+def _extract_vehicle_data(card: HtmlElement) -> VehicleRecord:
+    """Uncached body of extract_vehicle_data."""
     # 1. Gather Raw Data
     data = get_vehicle_header_info(card)
 
     # 2. Pricing
     raw_price = find_metric_value(card, "Starting Price")
     if not raw_price:
-        price_label = card.find("div", string="Starting Price")
-        if price_label:
-            parent = price_label.find_parent("div", direction="horizontal")
-            if parent:
-                for child in parent.find_all("div"):
-                    if "$" in child.get_text():
-                        raw_price = child.get_text().strip()
-                        break
+        for child in _XP_LABEL_ROW_DIVS(card, label="Starting Price"):
+            text = child.text_content()
+            if "$" in text:
+                raw_price = text.strip()
+                break
     data["price_reference"] = clean_price(raw_price)
 
     # 3. MPG
@@ -241,160 +360,337 @@ def extract_vehicle_data(card: BeautifulSoup) -> Optional[Dict[str, Any]]:
     data.update(ratings)
 
     # 5. Description
-    desc_div = card.find("div", class_=re.compile(r"e19qstch18"))
-    if desc_div:
-        desc_span = desc_div.find("span")
-        data["description"] = (
-            desc_span.text.strip() if desc_span else desc_div.text.strip()
-        )
-    else:
-        data["description"] = None
+    desc_div = _first(_XP_DESCRIPTION(card))
+    desc_span = _first(_XP_SPAN(desc_div)) if desc_div is not None else None
+    data["description"] = _text(desc_span if desc_span is not None else desc_div)
 
-    # --- PYDANTIC VALIDATION STEP ---
-    try:
-        # This line attempts to fit the raw data into our strict Vehicle blueprint
-        vehicle = Vehicle(**data)
+    return _finalize_vehicle_data(data)
 
-        # If successful, we convert it back to a clean dictionary
-        # exclude_none=False ensures we keep nulls for the database
-        return vehicle.model_dump()
 
-    except ValidationError as e:
-        # If data is bad (e.g. price is "Two Thousand"), this catches it!
-        error_id = data.get("kbb_id") or data.get("name") or "Unknown"
-        logger.error(f"❌ DATA VALIDATION FAILED for {error_id}: {e}")
+def find_vehicle_cards(content: bytes) -> List[HtmlElement]:
+    """Parses a page with lxml and returns its vehicle card elements."""
+    tree = lxml.html.fromstring(content, parser=_HTML_PARSER)
+    cards = _XP_CARDS(tree)
+    if not cards and _XP_CAPTCHA(tree):
+        logger.critical("CAPTCHA detected! Aborting.")
+    return cards
+
+
+def parse_page(content: bytes, page: int) -> Optional[Dict[str, VehicleRecord]]:
+    """
+    Parses one page into records keyed as page_<n>_<id>, or returns None if
+    it has no vehicle cards. Pure CPU work, so callers run it off the event loop.
+    """
+    vehicle_cards = find_vehicle_cards(content)
+    if not vehicle_cards:
         return None
 
+    page_data = {}
+    for card in vehicle_cards:
+        try:
+            # v_data is a bounds-checked VehicleRecord
+            v_data = extract_vehicle_data(card)
+
+            # Determine Key for JSON
+            primary_id = v_data.kbb_id
+
+            if not primary_id:
+                primary_id = card.get("id", "unknown_card")
+
+            unique_key = f"page_{page}_{primary_id}"
+            page_data[unique_key] = v_data
+
+        except Exception as e:
+            logger.error(f"Error processing card on page {page}: {e}")
+            continue
+    return page_data
+
 
 # ==========================================
 # 4. Main Scraper Loop
 # ==========================================
 
 
-def scrape_kbb_car_finder():
-    base_url = config.get("BaseURL")
-    data_file_path = config.get("DataFilePath")
-    max_retries = int(config.get("MaxRetries", 5))
-    backoff_factor = float(config.get("BackoffFactor", 0.5))
+class RetryAfterGate:
+    """
+    Holds back every fetch while a server's Retry-After is in force, so one
+    429 pauses all in-flight pages rather than just the one that got it.
+    """
 
-    session = create_session()
-    proxy_url = get_proxy()
-    proxies = {"http": proxy_url, "https": proxy_url}
+    def __init__(self) -> None:
+        self._resume_at = 0.0
 
-    headers = {
-        "User-Agent": get_user_agent(),
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.5",
-        "Referer": base_url,
-        "DNT": "1",
-        "Connection": "keep-alive",
-        "Upgrade-Insecure-Requests": "1",
-    }
-
-    all_vehicle_data = load_existing_data(data_file_path)
-    stats = {"updated": 0, "added": 0, "removed": 0}
-    total_start_time = time.time()
-    page = 1
+    def pause(self, seconds: float) -> None:
+        # Overlapping 429s extend the pause, never shorten it
+        self._resume_at = max(self._resume_at, time.monotonic() + seconds)
 
-    while True:
-        page_start_time = time.time()
-        url = f"{base_url}page-{page}/" if page > 1 else base_url
-        logger.info(f"Scraping page {page}...")
+    async def wait(self) -> None:
+        while (delay := self._resume_at - time.monotonic()) > 0:
+            await asyncio.sleep(delay)
 
-        content = None
+
+class ResultsEnd:
+    """
+    Records the first page seen without vehicle cards, whether the end of
+    the results or a CAPTCHA, so no request is sent for any page after it.
+    Fetches finish out of order, so the earliest such page wins.
+    """
+
+    def __init__(self) -> None:
+        self.page: Optional[int] = None
+
+    def mark(self, page: int) -> None:
+        if self.page is None or page < self.page:
+            self.page = page
+
+    def is_past(self, page: int) -> bool:
+        return self.page is not None and page > self.page
+
+
+def _note_results_end(content: bytes, page: int, end: ResultsEnd) -> bytes:
+    # A plain substring test is enough here: parse_page has the final say,
+    # this only has to never miss a page that does have cards
+    if _CARD_MARKER not in content:
+        end.mark(page)
+    return content
+
+
+async def fetch_page(
+    url: str,
+    page: int,
+    session,
+    proxies: dict,
+    semaphore: asyncio.Semaphore,
+    limiter: AsyncLimiter,
+    gate: RetryAfterGate,
+    end: ResultsEnd,
+    max_retries: int,
+    backoff_factor: float,
+) -> Optional[bytes]:
+    """
+    Fetches one page in a worker thread so the event loop keeps processing
+    earlier pages, retrying failed attempts with exponential backoff.
+    Cached pages return immediately; every network attempt, retries included,
+    waits out any shared Retry-After pause and then takes a token from the
+    shared limiter, so the request rate stays within the configured budget
+    however many fetches are in flight. The static headers live on the
+    session; only a fresh User-Agent is sent per page. Once an earlier
+    page is known to have no cards, the fetch gives up without a request.
+    Only pages with vehicle cards are written to the response cache.
+    """
+    content = await asyncio.to_thread(get_cached, url)
+    if content is not None:
+        logger.info(f"Using cached data for page {page}")
+        return _note_results_end(content, page, end)
+
+    headers = {"User-Agent": get_user_agent()}
+    async with semaphore:
+        logger.info(f"Scraping page {page}...")
         for i in range(max_retries):
+            # Checked before taking a limiter token, so skipped pages never
+            # spend the budget that retries of earlier pages are waiting on
+            if end.is_past(page):
+                return None
+            await gate.wait()
             try:
-                content = get_cached_or_request(url, session, headers, proxies)
+                async with limiter:
+                    # Checked again after the waits, which are where an
+                    # earlier page is most likely to have come back empty
+                    if end.is_past(page):
+                        return None
+                    content = await asyncio.to_thread(
+                        request_page, url, session, headers, proxies
+                    )
                 if content:
-                    break
+                    if _CARD_MARKER in content:
+                        await asyncio.to_thread(store_cached, url, content)
+                    return _note_results_end(content, page, end)
+            except RateLimitedError as e:
+                # Wait exactly as long as the server asks, when it says
+                retry_after = e.retry_after
+                if retry_after is None:
+                    retry_after = backoff_factor * (2**i)
+                logger.warning(
+                    f"Rate limited on page {page} (Attempt {i+1}). Pausing all requests for {retry_after:.2f}s"
+                )
+                gate.pause(retry_after)
             except Exception as e:
                 sleep_time = backoff_factor * (2**i) + random.uniform(0, 1)
                 logger.warning(
                     f"Error on page {page} (Attempt {i+1}): {e}. Retrying in {sleep_time:.2f}s"
                 )
-                time.sleep(sleep_time)
+                await asyncio.sleep(sleep_time)
+    return None
 
-        if not content:
-            logger.error(
-                f"Failed to retrieve page {page} after {max_retries} attempts."
-            )
-            break
 
-        soup = BeautifulSoup(content, "html.parser")
-        vehicle_cards = soup.find_all("div", id=re.compile(r"^vehicle_card_\d+"))
+def page_url(base_url: str, page: int) -> str:
+    """Returns the URL of a results page; page 1 is the base URL itself."""
+    return f"{base_url}page-{page}/" if page > 1 else base_url
 
-        if not vehicle_cards:
-            logger.info(f"No vehicle cards found on page {page}. Stopping.")
-            if soup.find("div", class_="g-recaptcha"):
-                logger.critical("CAPTCHA detected! Aborting.")
-            break
 
-        page_data = {}
-        for card in vehicle_cards:
-            try:
-                # v_data is now guaranteed to be a valid dictionary conforming to our Schema
-                # or None if validation failed
-                v_data = extract_vehicle_data(card)
+async def produce_pages(
+    queue: asyncio.Queue,
+    base_url: str,
+    fetch: Callable[[str, int], Awaitable[Optional[bytes]]],
+    end: ResultsEnd,
+) -> None:
+    """
+    Starts page fetches in page order and hands them to the consumer via queue.
+    The fetches themselves are throttled by fetch_page's semaphore and delay;
+    the queue bound limits how far ahead of the consumer we fetch. Scheduling
+    stops once a fetched page turns out to have no cards.
+    """
+    page = 1
 
-                if v_data:
-                    # Determine Key for JSON
-                    primary_id = v_data.get("kbb_id")
+    # The consumer stops at end.page, which is already queued by now
+    while not end.is_past(page):
+        url = page_url(base_url, page)
+        fetch_task = asyncio.create_task(fetch(url, page))
+        try:
+            await queue.put((page, fetch_task))
+        except asyncio.CancelledError:
+            fetch_task.cancel()
+            raise
 
-                    if not primary_id:
-                        primary_id = card.get("id", "unknown_card")
+        # Long break every 50 pages to mimic human behavior
+        if page % 50 == 0:
+            long_sleep = random.uniform(300, 600)  # 5-10 minutes
+            logger.info(f"Taking a long break of {long_sleep/60:.2f} minutes...")
+            await asyncio.sleep(long_sleep)
 
-                    unique_key = f"page_{page}_{primary_id}"
-                    page_data[unique_key] = v_data
+        page += 1
 
-            except Exception as e:
-                logger.error(f"Error processing card on page {page}: {e}")
-                continue
 
-        # Data Persistence
-        updated, added, removed = compare_and_update_data(
-            all_vehicle_data, page_data, page
-        )
+async def scrape_kbb_car_finder():
+    base_url = config.get("BaseURL")
+    data_file_path = config.get("DataFilePath")
+    max_retries = int(config.get("MaxRetries", 5))
+    backoff_factor = float(config.get("BackoffFactor", 0.5))
+    concurrency = int(config.get("MaxConcurrency", 8))
+    pretty_json = config.getboolean("PrettyJSON", False)
+    checkpoint_every = int(config.get("CheckpointEvery", 25))
 
-        stats["updated"] += len(updated)
-        stats["added"] += len(added)
-        stats["removed"] += len(removed)
+    session = create_session()
+    proxy_url = get_proxy()
+    proxies = {"http": proxy_url, "https": proxy_url}
+
+    # Set once on the session so every pooled request reuses them
+    session.headers.update(_STATIC_HEADERS)
+
+    os.makedirs(os.path.dirname(data_file_path), exist_ok=True)
+    stats = {"updated": 0, "added": 0, "removed": 0}
+    total_start_time = time.time()
+
+    results_end = ResultsEnd()
+    fetch = functools.partial(
+        fetch_page,
+        session=session,
+        proxies=proxies,
+        semaphore=asyncio.Semaphore(concurrency),
+        limiter=AsyncLimiter(
+            float(config.get("RateLimit", 1)), float(config.get("RatePeriod", 2))
+        ),
+        gate=RetryAfterGate(),
+        end=results_end,
+        max_retries=max_retries,
+        backoff_factor=backoff_factor,
+    )
+    # Enough queued fetches to keep every request slot busy
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    producer = asyncio.create_task(
+        produce_pages(queue, base_url, fetch, results_end)
+    )
+    upsert_worker = UpsertWorker()
+    upsert_worker.start()
+    journal = None
 
-        logger.info(
-            f"Page {page} Results: {len(updated)} Updated, {len(added)} Added, {len(removed)} Removed"
+    try:
+        # Disk work runs in a worker thread so the first fetches proceed meanwhile.
+        # The consumer awaits each call, so all_vehicle_data is never mutated
+        # while a thread is reading it.
+        all_vehicle_data = await asyncio.to_thread(
+            load_existing_data, data_file_path, VehicleRecord.from_dict
         )
+        page_index = build_page_index(all_vehicle_data)
+        # Held open for the whole run; replay above has already read it
+        journal = open_journal(data_file_path)
+
+        while True:
+            page, fetch_task = await queue.get()
+            content = await fetch_task
+            page_start_time = time.time()
+
+            if not content:
+                logger.error(
+                    f"Failed to retrieve page {page} after {max_retries} attempts."
+                )
+                break
 
-        if page_data:
-            logger.info(f"Syncing {len(page_data)} vehicles to database")
-            # This pushes the cleaned, validated data to the database
-            upserted_count = upsert_vehicle_batch(page_data)
-            logger.info(f"Successfully upserted {upserted_count} vehicles to database")
+            # Parsing runs in a worker thread so fetches keep being scheduled
+            page_data = await asyncio.to_thread(parse_page, content, page)
 
-        # Optimize Save Frequency: Only save local JSON every 10 pages to save disk I/O
-        if page % 10 == 0:
-            os.makedirs(os.path.dirname(data_file_path), exist_ok=True)
-            save_data(data_file_path, all_vehicle_data)
-            logger.info("Checkpoint: Saved local JSON backup.")
+            if page_data is None:
+                # fetch_page only caches pages that look like they have cards;
+                # drop this one too in case none of them parsed
+                await asyncio.to_thread(evict_cached, page_url(base_url, page))
+                logger.info(f"No vehicle cards found on page {page}. Stopping.")
+                break
 
-        duration = time.time() - page_start_time
-        logger.info(f"Processed page {page} in {duration:.2f}s")
+            # Data Persistence
+            updated, added, removed = compare_and_update_data(
+                all_vehicle_data, page_index, page_data, page
+            )
 
-        # Long break every 50 pages to mimic human behavior
-        if page % 50 == 0:
-            long_sleep = random.uniform(300, 600)  # 5-10 minutes
-            logger.info(f"Taking a long break of {long_sleep/60:.2f} minutes...")
-            time.sleep(long_sleep)
-        else:
-            delay = random.uniform(20, 60)
-            logger.info(f"Sleeping {delay:.2f}s before next page...")
-            time.sleep(delay)
+            stats["updated"] += len(updated)
+            stats["added"] += len(added)
+            stats["removed"] += len(removed)
 
-        page += 1
+            logger.info(
+                f"Page {page} Results: {len(updated)} Updated, {len(added)} Added, {len(removed)} Removed"
+            )
+
+            if page_data:
+                # The worker batches these with other pages and upserts in the background
+                upsert_worker.enqueue(page_data.values())
+                logger.info(f"Queued {len(page_data)} vehicles for database sync")
+
+            # Journal only this page's changes; the full JSON is compacted every
+            # checkpoint_every pages
+            await asyncio.to_thread(
+                append_page_jsonl, journal, page_data, updated + added, removed
+            )
+            if page % checkpoint_every == 0:
+                await asyncio.to_thread(
+                    save_data, data_file_path, all_vehicle_data, journal, pretty_json
+                )
+                logger.info("Checkpoint: Compacted local JSON backup.")
+
+            duration = time.time() - page_start_time
+            logger.info(f"Processed page {page} in {duration:.2f}s")
+    finally:
+        # Stop scheduling and drop fetches for pages past the last one
+        producer.cancel()
+        while not queue.empty():
+            _, pending = queue.get_nowait()
+            pending.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+        # Runs on Ctrl+C too, so queued vehicles still reach the database
+        logger.info("Flushing pending database upserts...")
+        upsert_worker.flush_and_close()
+        if journal is not None:
+            journal.close()
+
+    # Final compaction so the JSON file holds the complete dataset
+    await asyncio.to_thread(
+        save_data, data_file_path, all_vehicle_data, None, pretty_json
+    )
 
     # Final Summary
     total_duration = time.time() - total_start_time
     logger.info("=" * 50)
     logger.info(f"Scraping Completed in {total_duration:.2f}s")
     logger.info(f"Total Vehicles in DB: {len(all_vehicle_data)}")
+    logger.info(f"Vehicles Upserted: {upsert_worker.upserted}")
     logger.info(
         f"Session Stats: {stats['added']} Added | {stats['updated']} Updated | {stats['removed']} Removed"
     )
@@ -403,5 +699,6 @@ def scrape_kbb_car_finder():
 
 if __name__ == "__main__":
     setup_logging()
-    test_proxy()
-    scrape_kbb_car_finder()
+    # Checks the proxy through the same shared session the scraper uses
+    test_proxy(create_session())
+    asyncio.run(scrape_kbb_car_finder())
@@ -4,17 +4,16 @@ import os
 import sys
 import pip_system_certs.wrapt_requests
 import logging
-import hashlib
 import requests
-import random
 import time
+import functools
 import configparser
+from email.utils import parsedate_to_datetime
 from typing import Optional
-from cachetools import TTLCache
+from diskcache import Cache
 from fake_useragent import UserAgent
 from requests.adapters import HTTPAdapter, Retry
 from dotenv import load_dotenv
-import pip_system_certs.wrapt_requests
 
 logger = logging.getLogger(__name__)
 
@@ -22,9 +21,11 @@ logger = logging.getLogger(__name__)
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "../.env"))
 
 
+@functools.lru_cache(maxsize=4)
 def load_config(config_file="config.ini") -> configparser.SectionProxy:
     """
-    Load configuration from an INI file.
+    Load configuration from an INI file. Each file is parsed once; later
+    calls return the same section, which callers must treat as read-only.
 
     Args:
         config_file (str): The path to the configuration file.
@@ -101,26 +102,45 @@ def get_proxy() -> Optional[str]:
         return None
 
 
+@functools.lru_cache(maxsize=1)
 def create_session() -> requests.Session:
     """
-    Create a requests session with retry strategy.
+    Create a requests session with retry strategy and a keep-alive
+    connection pool sized for concurrent page fetches. The session is built
+    once and shared, so every caller reuses the same pooled connections.
 
     Returns:
         requests.Session: Configured requests session.
     """
     session = requests.Session()
+    # Only failed connections are retried here, as they never reach the
+    # server. Every response, 5xx included, surfaces to the caller so each
+    # retry is paced by its rate limiter and any Retry-After pause.
     retries = Retry(
         total=int(config.get("MaxRetries", 5)),
+        read=0,
         backoff_factor=float(config.get("BackoffFactor", 0.5)),
-        status_forcelist=[500, 502, 503, 504],
         allowed_methods=["HEAD", "GET", "OPTIONS"],
+        respect_retry_after_header=False,
     )
-    adapter = HTTPAdapter(max_retries=retries)
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=retries)
     session.mount("https://", adapter)
     session.mount("http://", adapter)
     return session
 
 
+@functools.lru_cache(maxsize=1)
+def _user_agent_factory() -> UserAgent:
+    """
+    Build the shared UserAgent; loading its browser data is the costly part,
+    so it happens once per process instead of on every call.
+
+    Returns:
+        UserAgent: The shared UserAgent instance.
+    """
+    return UserAgent()
+
+
 def get_user_agent() -> str:
     """
     Get a random User-Agent string.
@@ -129,22 +149,27 @@ def get_user_agent() -> str:
         str: Random User-Agent string.
     """
     try:
-        ua = UserAgent()
-        return ua.random
+        return _user_agent_factory().random
     except Exception as e:
         logger.warning(f"Error getting user agent: {e}")
         return "Mozilla/5.0"
 
 
-def test_proxy():
+def test_proxy(session: Optional[requests.Session] = None):
     """
     Test the proxy configuration by making a simple request.
+
+    Args:
+        session (Optional[requests.Session]): Session to test through; the
+            shared session from create_session is used if omitted.
     """
     proxy_url = get_proxy()
     if proxy_url:
         proxies = {"http": proxy_url, "https": proxy_url}
+        if session is None:
+            session = create_session()
         try:
-            response = requests.get(
+            response = session.get(
                 "https://www.google.com", proxies=proxies, timeout=10
             )
             if response.status_code == 200:
@@ -159,54 +184,127 @@ def test_proxy():
         logger.info("No proxy configured.")
 
 
-# Initialize cache with TTL of 24 hours
-cache = TTLCache(maxsize=1000, ttl=86400)
+CACHE_TTL = int(config.get("HttpCacheTTL", 86400))
+
+
+@functools.lru_cache(maxsize=1)
+def get_cache() -> Cache:
+    """
+    Open the on-disk response cache on first use, so importing this module
+    never creates the cache directory. Re-runs within the TTL skip the
+    network, and diskcache is safe to share between the fetch threads
+    without a lock.
+
+    Returns:
+        Cache: The shared response cache.
+    """
+    return Cache(config.get("HttpCachePath", "data/.httpcache"))
 
 
-def get_cached_or_request(
+def get_cached(url: str) -> Optional[bytes]:
+    """
+    Look up a cached response without touching the network.
+
+    Args:
+        url (str): URL whose response to look up.
+
+    Returns:
+        Optional[bytes]: The cached response body, or None on a miss.
+    """
+    return get_cache().get(url)
+
+
+def store_cached(url: str, content: bytes) -> None:
+    """
+    Cache a response for CACHE_TTL seconds. Callers decide what is worth
+    keeping; a CAPTCHA or empty page must never be stored.
+
+    Args:
+        url (str): URL the response was retrieved from.
+        content (bytes): The raw response body.
+    """
+    get_cache().set(url, content, expire=CACHE_TTL)
+
+
+def evict_cached(url: str) -> None:
+    """
+    Drop a cached response, e.g. a CAPTCHA or empty page that must not be
+    served again on the next run.
+
+    Args:
+        url (str): URL whose response to drop.
+    """
+    get_cache().delete(url)
+
+
+def _retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header given either as seconds or as an HTTP date.
+
+    Args:
+        value (Optional[str]): The raw header value.
+
+    Returns:
+        Optional[float]: Seconds to wait, or None if absent or unparsable.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class RateLimitedError(requests.HTTPError):
+    """
+    Raised when the server answers 429, carrying how long it asked us to wait.
+    """
+
+    def __init__(self, message, retry_after: Optional[float] = None, response=None):
+        super().__init__(message, response=response)
+        self.retry_after = retry_after
+
+
+def request_page(
     url: str,
     session: requests.Session,
-    headers: dict,
+    headers: Optional[dict],
     proxies: dict,
-    max_retries: int = 5,
-) -> Optional[str]:
+) -> bytes:
     """
-    Retrieve content from cache or make an HTTP GET request with retries.
+    Make a single HTTP GET request. Retries are left to the caller, so each
+    attempt can be paced by its rate limiter. The response cache is neither
+    read nor written here; the caller checks it with get_cached first and
+    stores the page with store_cached once it knows it is worth keeping.
 
     Args:
         url (str): URL to retrieve.
         session (requests.Session): Session object for making requests.
-        headers (dict): Headers to include in the request.
+        headers (Optional[dict]): Per-request headers merged over the
+            session headers, or None to send only the session headers.
         proxies (dict): Proxies to use for the request.
-        max_retries (int): Maximum number of retries.
 
     Returns:
-        Optional[str]: The content retrieved from the URL or None if failed.
-    """
-    cache_key = hashlib.md5(url.encode()).hexdigest()
-    if cache_key in cache:
-        logger.info(f"Using cached data for {url}")
-        return cache[cache_key]
+        bytes: The raw response body, left undecoded for the HTML parser.
 
-    retry_count = 0
-    backoff_factor = float(config.get("BackoffFactor", 0.5))
-    while retry_count < max_retries:
-        try:
-            response = session.get(
-                url, headers=headers, proxies=proxies, timeout=30, verify=False
-            )
-            response.raise_for_status()
-            cache[cache_key] = response.text
-            logger.info(f"Successfully retrieved {url}")
-            return response.text
-        except requests.RequestException as e:
-            retry_count += 1
-            sleep_time = backoff_factor * (2 ** (retry_count - 1)) + random.uniform(
-                0, 1
-            )
-            logger.warning(
-                f"Request failed ({retry_count}/{max_retries}) for {url}: {e}. Retrying in {sleep_time:.2f} seconds..."
-            )
-            time.sleep(sleep_time)
-    logger.error(f"Failed to retrieve the page {url} after {max_retries} attempts.")
-    return None
+    Raises:
+        RateLimitedError: If the server responded 429.
+        requests.RequestException: If the request failed for any other reason.
+    """
+    # Certificates are verified against the system store that
+    # pip_system_certs wires into requests
+    response = session.get(url, headers=headers, proxies=proxies, timeout=30)
+    if response.status_code == 429:
+        raise RateLimitedError(
+            f"429 Too Many Requests for url: {url}",
+            retry_after=_retry_after_seconds(response.headers.get("Retry-After")),
+            response=response,
+        )
+    response.raise_for_status()
+    logger.info(f"Successfully retrieved {url}")
+    return response.content
@@ -10,9 +10,14 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../s
 
 from data_processing import (
     load_existing_data,
+    build_page_index,
     compare_and_update_data,
+    open_journal,
+    append_page_jsonl,
+    jsonl_to_dict,
     save_data
 )
+from models import VehicleRecord
 
 class TestDataProcessing(unittest.TestCase):
 
@@ -53,13 +58,29 @@ class TestDataProcessing(unittest.TestCase):
             'page_1_item2': {'value': 20},  # Updated
             'page_1_item4': {'value': 4}    # Added
         }
-        updated, added, removed = compare_and_update_data(all_data, new_page_data, page_number=1)
+        page_index = build_page_index(all_data)
+        updated, added, removed = compare_and_update_data(all_data, page_index, new_page_data, page_number=1)
         self.assertEqual(updated, ['page_1_item2'])
         self.assertEqual(added, ['page_1_item4'])
         self.assertEqual(removed, [], "No items should be removed")
         self.assertIn('page_1_item2', all_data)
         self.assertIn('page_1_item4', all_data)
         self.assertNotIn('page_1_item2', removed, "Updated items should not be in removed list.")
+        self.assertEqual(page_index[1], {'page_1_item1', 'page_1_item2', 'page_1_item4'})
+
+    def test_compare_and_update_data_removed(self):
+        all_data = {
+            'page_1_item1': {'value': 1},
+            'page_1_item2': {'value': 2},
+            'page_2_item3': {'value': 3}
+        }
+        page_index = build_page_index(all_data)
+        new_page_data = {'page_1_item1': {'value': 1}}
+        updated, added, removed = compare_and_update_data(all_data, page_index, new_page_data, page_number=1)
+        self.assertEqual((updated, added, removed), ([], [], ['page_1_item2']))
+        self.assertNotIn('page_1_item2', all_data)
+        self.assertIn('page_2_item3', all_data, "Entries on other pages must be left alone.")
+        self.assertEqual(page_index, {1: {'page_1_item1'}, 2: {'page_2_item3'}})
 
     def test_save_data_success(self):
         test_data = {'key1': 'value1', 'key2': 'value2'}
@@ -67,6 +88,64 @@ class TestDataProcessing(unittest.TestCase):
         with open(self.test_file, 'r') as f:
             data = json.load(f)
         self.assertEqual(data, test_data, "Data saved should match the data provided.")
+        self.assertFalse(os.path.exists(self.test_file + '.tmp'), "The temporary file should be renamed into place.")
+
+    def test_append_page_jsonl_replayed_on_load(self):
+        save_data(self.test_file, {'page_1_item1': {'value': 1}, 'page_1_item2': {'value': 2}})
+        page_data = {'page_1_item1': {'value': 10}, 'page_1_item3': {'value': 3}}
+        with open_journal(self.test_file) as journal:
+            append_page_jsonl(journal, page_data, ['page_1_item1', 'page_1_item3'], ['page_1_item2'])
+        data = load_existing_data(self.test_file)
+        self.assertEqual(data, {'page_1_item1': {'value': 10}, 'page_1_item3': {'value': 3}})
+
+    def test_jsonl_to_dict(self):
+        journal_path = self.test_file + '.jsonl'
+        with open(journal_path, 'w') as f:
+            f.write('["page_1_a", {"value": 1}]\n["page_1_b", {"value": 2}]\n["page_1_b", null]\n')
+        with open_journal(self.test_file) as journal:
+            append_page_jsonl(journal, {'page_1_c': {'value': 3}}, ['page_1_c'], ['page_1_a'])
+        self.assertEqual(jsonl_to_dict(journal_path), {'page_1_c': {'value': 3}})
+
+    def test_save_data_compacts_journal(self):
+        page_data = {'page_1_item1': {'value': 1}}
+        with open_journal(self.test_file) as journal:
+            append_page_jsonl(journal, page_data, ['page_1_item1'], [])
+        self.assertTrue(os.path.exists(self.test_file + '.jsonl'))
+        save_data(self.test_file, page_data)
+        self.assertFalse(os.path.exists(self.test_file + '.jsonl'), "Compaction should remove the journal.")
+        self.assertEqual(load_existing_data(self.test_file), page_data)
+
+    def test_vehicle_records_round_trip(self):
+        record = VehicleRecord(kbb_id='/suzuki/samurai/1992/', name='1992 Suzuki Samurai', year=1992)
+        save_data(self.test_file, {'page_1_a': record})
+        updated = VehicleRecord(kbb_id='/suzuki/samurai/1992/', name='1992 Suzuki Samurai', year=1992, price_reference=2731)
+        with open_journal(self.test_file) as journal:
+            append_page_jsonl(journal, {'page_1_a': updated}, ['page_1_a'], [])
+        data = load_existing_data(self.test_file, VehicleRecord.from_dict)
+        self.assertEqual(data, {'page_1_a': updated})
+
+    def test_load_existing_data_skips_malformed_record(self):
+        with open(self.test_file, 'w') as f:
+            json.dump({'page_1_a': {'year': 1992}, 'page_1_b': None, 'page_1_c': {'year': 2026}}, f)
+        with open_journal(self.test_file) as journal:
+            append_page_jsonl(journal, {'page_1_d': VehicleRecord(year=2025)}, ['page_1_d'], [])
+        data = load_existing_data(self.test_file, VehicleRecord.from_dict)
+        # The bad entry is dropped; the rest of the snapshot and the journal still load
+        self.assertEqual(data, {
+            'page_1_a': VehicleRecord(year=1992),
+            'page_1_c': VehicleRecord(year=2026),
+            'page_1_d': VehicleRecord(year=2025),
+        })
+
+    def test_save_data_truncates_open_journal(self):
+        data = {'page_1_item1': {'value': 1}}
+        with open_journal(self.test_file) as journal:
+            append_page_jsonl(journal, data, ['page_1_item1'], [])
+            save_data(self.test_file, data, journal)
+            append_page_jsonl(journal, {'page_1_item2': {'value': 2}}, ['page_1_item2'], [])
+        self.assertEqual(load_existing_data(self.test_file), {'page_1_item1': {'value': 1}, 'page_1_item2': {'value': 2}})
+        with open(self.test_file + '.jsonl', 'rb') as f:
+            self.assertEqual(f.read().count(b'\n'), 1, "Only the post-checkpoint page should remain.")
 
     def test_save_data_failure(self):
         # Attempt to save data to an invalid path
@@ -1,15 +1,27 @@
 # test_scraper.py
 
 import unittest
+from unittest.mock import patch, MagicMock
 import os, sys
-from bs4 import BeautifulSoup
+import asyncio
+import lxml.html
+from aiolimiter import AsyncLimiter
 
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
-from scraper import extract_vehicle_data
+from scraper import extract_vehicle_data, parse_page, fetch_page, RetryAfterGate, ResultsEnd
+from utils import RateLimitedError
+from models import VehicleRecord
 
 class TestScraper(unittest.TestCase):
 
+    def _fetch_page(self, url, page, end, limiter=None, gate=None):
+        return asyncio.run(fetch_page(
+            url, page, MagicMock(), {}, asyncio.Semaphore(1),
+            limiter or AsyncLimiter(100, 1), gate or RetryAfterGate(), end,
+            max_retries=3, backoff_factor=0.5
+        ))
+
     def test_extract_vehicle_data_sample1(self):
         # HTML snippet for the first vehicle card example
         html_content = '''
@@ -74,24 +86,22 @@ class TestScraper(unittest.TestCase):
             </div>
         </div>
         '''
-        soup = BeautifulSoup(html_content, 'html.parser')
-        card = soup.find('div', id='vehicle_card_0')  # Adjusted line
+        card = lxml.html.fromstring(html_content)
         data = extract_vehicle_data(card)
         expected_data = {
-            'id': 'vehicle_card_0',
+            'kbb_id': '/land-rover/range-rover-evoque/',
             'name': '2026 Land Rover Range Rover Evoque',
+            'year': 2026,
             'make': 'Land',
             'model': 'Rover Range Rover Evoque',
-            'year': '2026',
             'category': 'SUV',
-            'name_verification': '2026 Land Rover Range Rover Evoque',
-            'starting_price': '$51,175',
-            'fuel_economy': '22 MPG',
-            'expert_rating': 'N/A',
-            'consumer_rating': '3.4',
-            'description': 'N/A'
+            'price_reference': 51175,
+            'mpg_combined': 22,
+            'rating_expert': None,
+            'rating_consumer': 3.4,
+            'description': None
         }
-        self.assertEqual(data, expected_data)
+        self.assertEqual(data, VehicleRecord(**expected_data))
 
     def test_extract_vehicle_data_sample2(self):
         # HTML snippet for the second vehicle card example
@@ -157,24 +167,102 @@ class TestScraper(unittest.TestCase):
             </div>
         </div>
         '''
-        soup = BeautifulSoup(html_content, 'html.parser')
-        card = soup.find('div', id='vehicle_card_33')  # Adjusted line
+        card = lxml.html.fromstring(html_content)
         data = extract_vehicle_data(card)
         expected_data = {
-            'id': 'vehicle_card_33',
+            'kbb_id': '/suzuki/samurai/1992/',
             'name': '1992 Suzuki Samurai',
+            'year': 1992,
             'make': 'Suzuki',
             'model': 'Samurai',
-            'year': '1992',
             'category': 'SUV',
-            'name_verification': '1992 Suzuki Samurai',
-            'starting_price': '$2,731',
-            'fuel_economy': '25 MPG',
-            'expert_rating': 'N/A',
-            'consumer_rating': '4.5',
-            'description': 'N/A'
+            'price_reference': 2731,
+            'mpg_combined': 25,
+            'rating_expert': None,
+            'rating_consumer': 4.5,
+            'description': None
         }
-        self.assertEqual(data, expected_data)
+        self.assertEqual(data, VehicleRecord(**expected_data))
+        # An identical card is served from the cache without re-extraction
+        self.assertIs(extract_vehicle_data(lxml.html.fromstring(html_content)), data)
+
+    def test_extract_vehicle_data_description_blurb(self):
+        html_content = '''
+        <div id="vehicle_card_1" class="ewtqiv33 css-dkiyok e11el9oi0">
+            <div class="css-3oc9y8 e19qstch20">Sedan</div>
+            <a href="/honda/accord/" class="css-z66djy ewtqiv30">2025 Honda Accord</a>
+            <div class="css-14q4cew e19qstch18">
+                <div class="css-hryd08">Expert (<span class="css-1rttn8x">N/A</span>)</div>
+            </div>
+            <div class="css-1bclrc1 e19qstch17"><span>Roomy, efficient and fun to drive.</span></div>
+        </div>
+        '''
+        data = extract_vehicle_data(lxml.html.fromstring(html_content))
+        self.assertEqual(data.category, 'Sedan')
+        self.assertEqual(data.description, 'Roomy, efficient and fun to drive.')
+
+    def test_parse_page_without_cards(self):
+        self.assertIsNone(parse_page(b'<html><body><div id="results"></div></body></html>', 1))
+
+    @patch('scraper.get_cached', return_value=None)
+    @patch('scraper.request_page')
+    def test_fetch_page_pauses_every_fetch_on_retry_after(self, mock_request, mock_cached):
+        mock_request.side_effect = [RateLimitedError('429', retry_after=0.2), b'<html></html>']
+        gate = RetryAfterGate()
+        limiter = MagicMock(wraps=AsyncLimiter(100, 1))
+
+        with patch.object(gate, 'pause', wraps=gate.pause) as mock_pause:
+            content = self._fetch_page('http://example.com', 1, ResultsEnd(), limiter, gate)
+        self.assertEqual(content, b'<html></html>')
+        mock_pause.assert_called_once_with(0.2)
+        # The retry took its own limiter token
+        self.assertEqual(limiter.__aenter__.call_count, 2)
+
+    @patch('scraper.get_cached', return_value=None)
+    @patch('scraper.request_page')
+    def test_fetch_page_skips_pages_past_the_results_end(self, mock_request, mock_cached):
+        mock_request.return_value = b'<html><body><div id="results"></div></body></html>'
+        end = ResultsEnd()
+        limiter = MagicMock(wraps=AsyncLimiter(100, 1))
+
+        def fetch(page):
+            return self._fetch_page(f'http://example.com/page-{page}/', page, end, limiter)
+
+        self.assertIsNotNone(fetch(3))
+        self.assertEqual(end.page, 3)
+        # Earlier pages are still fetched; later ones never reach the network
+        self.assertIsNotNone(fetch(2))
+        self.assertIsNone(fetch(4))
+        self.assertEqual(mock_request.call_count, 2)
+        # Skipped pages take no limiter token either
+        self.assertEqual(limiter.__aenter__.call_count, 2)
+
+    @patch('scraper.store_cached')
+    @patch('scraper.get_cached', return_value=None)
+    @patch('scraper.request_page')
+    def test_fetch_page_caches_only_pages_with_cards(self, mock_request, mock_cached, mock_store):
+        cards = b'<html><body><div id="vehicle_card_0"></div></body></html>'
+        captcha = b'<html><body><div class="g-recaptcha"></div></body></html>'
+        mock_request.side_effect = [cards, captcha]
+        end = ResultsEnd()
+
+        self.assertEqual(self._fetch_page('http://example.com/page-4/', 4, end), cards)
+        # A page past the end comes back without cards and is never cached
+        self.assertEqual(self._fetch_page('http://example.com/page-5/', 5, end), captcha)
+        mock_store.assert_called_once_with('http://example.com/page-4/', cards)
+        self.assertEqual(end.page, 5)
+
+    def test_retry_after_gate_holds_back_other_fetches(self):
+        gate = RetryAfterGate()
+
+        async def run():
+            gate.pause(0.2)
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            await gate.wait()
+            return loop.time() - start
+
+        self.assertGreaterEqual(asyncio.run(run()), 0.19)
 
 if __name__ == '__main__':
     unittest.main()
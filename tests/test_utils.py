@@ -5,6 +5,8 @@ from unittest.mock import patch, MagicMock
 import os
 import sys
 import requests
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
@@ -14,8 +16,12 @@ from utils import (
     get_proxy,
     create_session,
     get_user_agent,
-    get_cached_or_request,
+    request_page,
+    store_cached,
+    evict_cached,
+    RateLimitedError,
     setup_logging,
+    CACHE_TTL,
     config
 )
 
@@ -50,33 +56,68 @@ class TestUtils(unittest.TestCase):
         self.assertIsInstance(user_agent, str)
         self.assertTrue(len(user_agent) > 0)
 
-    @patch('utils.cache')
+    @patch('utils.get_cache')
     @patch('utils.requests.Session.get')
-    def test_get_cached_or_request_with_cache(self, mock_get, mock_cache):
+    def test_request_page(self, mock_get, mock_cache):
         url = 'http://example.com'
-        mock_cache.__contains__.return_value = True
-        mock_cache.__getitem__.return_value = 'Cached Content'
-        session = MagicMock()
-        headers = {}
-        proxies = {}
-        content = get_cached_or_request(url, session, headers, proxies)
-        self.assertEqual(content, 'Cached Content')
-        mock_get.assert_not_called()
-
-    @patch('utils.cache')
-    @patch('utils.requests.Session.get')
-    def test_get_cached_or_request_without_cache(self, mock_get, mock_cache):
-        url = 'http://example.com'
-        mock_cache.__contains__.return_value = False
         mock_get.return_value.status_code = 200
-        mock_get.return_value.text = 'New Content'
+        mock_get.return_value.content = b'New Content'
         session = requests.Session()
         headers = {}
         proxies = {}
-        content = get_cached_or_request(url, session, headers, proxies)
-        self.assertEqual(content, 'New Content')
+        content = request_page(url, session, headers, proxies)
+        self.assertEqual(content, b'New Content')
         mock_get.assert_called_once_with(url, headers=headers, proxies=proxies, timeout=30)
-        mock_cache.__setitem__.assert_called_once()
+        # The caller reads the cache first and stores pages that have cards
+        mock_cache.assert_not_called()
+
+    @patch('utils.requests.Session.get')
+    def test_request_page_raises_on_rate_limit(self, mock_get):
+        mock_get.return_value = MagicMock(status_code=429, headers={'Retry-After': '7'})
+        with self.assertRaises(RateLimitedError) as ctx:
+            request_page('http://example.com', requests.Session(), {}, {})
+        self.assertEqual(ctx.exception.retry_after, 7.0)
+        # A single attempt; retrying is the caller's job
+        mock_get.assert_called_once()
+
+    def test_request_page_surfaces_server_errors(self):
+        hits = []
+
+        class Unavailable(BaseHTTPRequestHandler):
+            def do_GET(self):
+                hits.append(self.path)
+                self.send_response(503)
+                self.send_header('Retry-After', '1')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Unavailable)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        url = f'http://127.0.0.1:{server.server_port}/'
+        with self.assertRaises(requests.HTTPError) as ctx:
+            request_page(url, create_session(), {}, {})
+        # The shared session does not retry the 503 itself, so the caller's
+        # rate-limited retry loop sees it after a single request
+        self.assertEqual(ctx.exception.response.status_code, 503)
+        self.assertEqual(len(hits), 1)
+
+    @patch('utils.get_cache')
+    def test_store_cached(self, mock_cache):
+        store_cached('http://example.com', b'Content')
+        mock_cache.return_value.set.assert_called_once_with(
+            'http://example.com', b'Content', expire=CACHE_TTL
+        )
+
+    @patch('utils.get_cache')
+    def test_evict_cached(self, mock_cache):
+        evict_cached('http://example.com')
+        mock_cache.return_value.delete.assert_called_once_with('http://example.com')
 
 if __name__ == '__main__':
     unittest.main()